@@ -1,28 +1,41 @@
 
 
-from fastapi import FastAPI, HTTPException, Query, Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, Response, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Optional
 from datetime import datetime, timedelta
-import base64
-import uvicorn
+import hashlib
+import sqlite3
+import threading
+import time
+import numpy as np
+import orjson
 
 from models import (
-    FlightSearch, 
     FlightResponse, 
     FlightDetail, 
     BookingRequest, 
     BookingResponse,
     PricingResponse
 )
-from db_config import get_db_connection
-from pricing_engine import calculate_dynamic_price
-from utils import generate_pnr, calculate_refund_percentage, format_price, format_datetime
+from db_config import get_reader, get_writer
+import cache
+from pricing_engine import calculate_dynamic_price, batch_dynamic_price, warm_up_batch_pricing
+from utils import calculate_refund_percentage
+
+@asynccontextmanager
+async def lifespan(app):
+    cache.connect()
+    warm_up_batch_pricing()
+    yield
+    cache.close()
 
 app = FastAPI(
     title="Flight Booking API",
     description="API for flight search, pricing, and booking",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -34,15 +47,242 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Public GET endpoints whose responses browsers and CDNs may cache briefly
+HTTP_CACHE_PREFIXES = ("/api/flights/", "/api/pricing/flight/")
+HTTP_CACHE_CONTROL = "public, max-age=60"
+
+@app.middleware("http")
+async def add_cache_headers(request: Request, call_next):
+    """
+    Tag cacheable GET responses with an ETag and answer matching
+    If-None-Match requests with 304 Not Modified
+    """
+    response = await call_next(request)
+    if (
+        request.method != "GET"
+        or response.status_code != 200
+        or not request.url.path.startswith(HTTP_CACHE_PREFIXES)
+    ):
+        return response
+    
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = f'"{hashlib.md5(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": HTTP_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        # A 304 must carry the same Vary and CORS headers as the 200 it replaces
+        for name, value in response.headers.items():
+            if name == "vary" or name.startswith("access-control-"):
+                headers[name] = value
+        return Response(status_code=304, headers=headers)
+    
+    response_headers = dict(response.headers)
+    response_headers.update(headers)
+    return Response(
+        content=body,
+        status_code=response.status_code,
+        headers=response_headers,
+        media_type=response.media_type
+    )
+
+# Endpoints that touch SQLite are declared with plain `def` so FastAPI runs
+# them on its threadpool instead of blocking the event loop; the reader pool
+# and writer lock in db_config are sized for that.
+
+# SQL for the hot paths, kept as constants so every call hits the
+# connection's statement cache with the same text
+_SEARCH_SQL = """
+    SELECT f.flight_id, f.flight_number, a.airline_name, 
+           f.origin, f.destination, f.departure_time, f.arrival_time,
+           f.base_price, f.total_seats, s.available_seats, s.price_multiplier
+    FROM Flights f
+    JOIN Airlines a ON f.airline_id = a.airline_id
+    JOIN Seats s ON s.flight_id = f.flight_id AND s.seat_class = ?
+    WHERE f.origin = ? AND f.destination = ? 
+    AND f.departure_time >= ? AND f.departure_time < ?
+"""
+
+# Sorts that only depend on stored columns are done by SQLite
+_SEARCH_SQL_BY_SORT = {
+    "duration": _SEARCH_SQL + "ORDER BY julianday(f.arrival_time) - julianday(f.departure_time)",
+    "departure_time": _SEARCH_SQL + "ORDER BY f.departure_time",
+}
+
+# Bookings are paged newest first; booking_id breaks ties between bookings
+# made in the same second so the keyset cursor never skips or repeats a row
+_USER_BOOKINGS_SQL = """
+    SELECT b.booking_id, b.flight_id, f.flight_number, a.airline_name,
+           f.origin, f.destination, f.departure_time, f.arrival_time,
+           b.seat_class, b.seats_booked, b.final_price, b.booking_date,
+           b.status, b.pnr
+    FROM Bookings b
+    JOIN Flights f ON b.flight_id = f.flight_id
+    JOIN Airlines a ON f.airline_id = a.airline_id
+    WHERE b.user_id = ? {}
+    ORDER BY b.booking_date DESC, b.booking_id
+    LIMIT ?
+"""
+_USER_BOOKINGS_FIRST_SQL = _USER_BOOKINGS_SQL.format("")
+_USER_BOOKINGS_BEFORE_SQL = _USER_BOOKINGS_SQL.format(
+    "AND b.booking_date <= ? AND (b.booking_date < ? OR b.booking_id > ?)"
+)
+
+_FLIGHT_META_SQL = """
+    SELECT f.flight_id, f.flight_number, a.airline_name, 
+           f.origin, f.destination, f.departure_time, f.arrival_time,
+           f.base_price, f.total_seats
+    FROM Flights f
+    JOIN Airlines a ON f.airline_id = a.airline_id
+    WHERE f.flight_id = ?
+"""
+
+_SEAT_SQL = """
+    SELECT available_seats, price_multiplier 
+    FROM Seats 
+    WHERE flight_id = ? AND seat_class = ?
+"""
+
+# The PNR is 8 random hex characters generated by SQLite; the UNIQUE
+# constraint on Bookings.pnr catches the rare collision
+_INSERT_BOOKING_SQL = """
+    INSERT INTO Bookings (flight_id, user_id, seat_class, seats_booked, final_price, booking_date, status, pnr)
+    VALUES (?, ?, ?, ?, ?, ?, ?, upper(hex(randomblob(4))))
+    RETURNING booking_id, pnr
+"""
+PNR_ATTEMPTS = 3
+
+_INSERT_PASSENGER_SQL = """
+    INSERT INTO Passengers (booking_id, first_name, last_name, email, phone)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# Check-and-decrement in one statement; no row back means the class is
+# missing or has too few seats
+_RESERVE_SEATS_SQL = """
+    UPDATE Seats
+    SET available_seats = available_seats - ?
+    WHERE flight_id = ? AND seat_class = ? AND available_seats >= ?
+    RETURNING available_seats, price_multiplier
+"""
+
+_INSERT_TRANSACTION_SQL = """
+    INSERT INTO Transactions (booking_id, amount, payment_method, status, transaction_date)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+_INSERT_HISTORY_SQL = """
+    INSERT INTO BookingHistory (booking_id, action, details, performed_at)
+    VALUES (?, ?, ?, ?)
+"""
+
+# Per-process cache of immutable flight columns; seat counts always come from SQLite
+FLIGHT_META_MAXSIZE = 4096
+FLIGHT_META_TTL = 300  # seconds
+_flight_meta = {}
+_flight_meta_lock = threading.Lock()
+
+def _load_flight_meta(conn, flight_id):
+    """
+    Get flight metadata, reading through to the database on a cache miss
+    
+    Args:
+        conn: Open database connection to use on a miss
+        flight_id: Flight ID
+        
+    Returns:
+        Dict of flight columns, or None if the flight does not exist
+    """
+    now = time.monotonic()
+    with _flight_meta_lock:
+        entry = _flight_meta.get(flight_id)
+    if entry and entry[0] > now:
+        return entry[1]
+    
+    row = conn.execute(_FLIGHT_META_SQL, (flight_id,)).fetchone()
+    if row is None:
+        return None
+    
+    meta = dict(row)
+    with _flight_meta_lock:
+        if flight_id not in _flight_meta and len(_flight_meta) >= FLIGHT_META_MAXSIZE:
+            # Evict the oldest entry (dicts keep insertion order)
+            _flight_meta.pop(next(iter(_flight_meta)))
+        _flight_meta[flight_id] = (now + FLIGHT_META_TTL, meta)
+    return meta
+
+def _json_response(content):
+    """
+    Serialize trusted, already-shaped data with orjson, skipping response_model validation
+    """
+    return Response(content=orjson.dumps(content), media_type="application/json")
+
 # Health check endpoint
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "ok", "timestamp": datetime.now().isoformat()}
 
+def _find_flights(origin, destination, departure_day, seat_class, sort_by):
+    """
+    Query and price flights for a search, sorted as requested
+    """
+    # Range on the raw column so the (origin, destination, departure_time) index applies
+    day_start = departure_day.isoformat()
+    next_day = (departure_day + timedelta(days=1)).isoformat()
+    
+    with get_reader() as conn:
+        cursor = conn.cursor()
+        
+        # Query flights together with seat availability for the requested class
+        cursor.execute(
+            _SEARCH_SQL_BY_SORT.get(sort_by, _SEARCH_SQL),
+            (seat_class, origin, destination, day_start, next_day)
+        )
+        rows = cursor.fetchall()
+    
+    if not rows:
+        return []
+    
+    # Price every flight in one batch call (a compiled Numba loop, or NumPy
+    # ufuncs without Numba). The endpoint already runs on FastAPI's
+    # threadpool, so this does not block the event loop, and one batch call
+    # is cheaper than fanning rows out to worker threads.
+    columns = list(zip(*rows))
+    dynamic_prices = batch_dynamic_price(
+        base_price=np.array(columns[7], dtype=float),
+        seat_class_multiplier=np.array(columns[10], dtype=float),
+        available_seats=np.array(columns[9], dtype=float),
+        total_seats=np.array(columns[8], dtype=float),
+        departure_time=np.array(columns[5], dtype="datetime64[s]")
+    )
+    
+    flights = []
+    for row, dynamic_price in zip(rows, dynamic_prices.tolist()):
+        (flight_id, flight_number, airline_name, origin, destination, departure_time, arrival_time,
+         base_price, total_seats, available_seats, price_multiplier) = row
+        
+        flights.append({
+            "flight_id": flight_id,
+            "flight_number": flight_number,
+            "airline_name": airline_name,
+            "origin": origin,
+            "destination": destination,
+            "departure_time": departure_time,
+            "arrival_time": arrival_time,
+            "base_price": base_price,
+            "dynamic_price": round(dynamic_price, 2),
+            "available_seats": available_seats,
+            "seat_class": seat_class
+        })
+        
+    # Price depends on the computed fare; other sorts came back ordered from SQL
+    if sort_by == "price":
+        flights.sort(key=lambda x: x["dynamic_price"])
+    
+    return flights
+
 # Search flights endpoint
-@app.get("/api/flights/search", response_model=List[FlightResponse])
-async def search_flights(
+@app.get("/api/flights/search", responses={200: {"model": List[FlightResponse]}})
+def search_flights(
     origin: str = Query(..., min_length=3, max_length=3, description="Origin airport code"),
     destination: str = Query(..., min_length=3, max_length=3, description="Destination airport code"),
     departure_date: str = Query(..., description="Departure date in YYYY-MM-DD format"),
@@ -53,78 +293,15 @@ async def search_flights(
     Search for flights based on origin, destination, and date
     """
     try:
-        # Validate date format
-        datetime.strptime(departure_date, "%Y-%m-%d")
-        
-        # Connect to database
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Query flights
-        cursor.execute("""
-            SELECT f.flight_id, f.flight_number, a.airline_name, 
-                   f.origin, f.destination, f.departure_time, f.arrival_time,
-                   f.base_price, f.total_seats
-            FROM Flights f
-            JOIN Airlines a ON f.airline_id = a.airline_id
-            WHERE f.origin = ? AND f.destination = ? 
-            AND DATE(f.departure_time) = ?
-        """, (origin, destination, departure_date))
-        
-        flights = []
-        for row in cursor.fetchall():
-            flight_id, flight_number, airline_name, origin, destination, departure_time, arrival_time, base_price, total_seats = row
-            
-            # Get seat availability
-            cursor.execute("""
-                SELECT available_seats, price_multiplier 
-                FROM Seats 
-                WHERE flight_id = ? AND seat_class = ?
-            """, (flight_id, seat_class))
-            
-            seat_info = cursor.fetchone()
-            if not seat_info:
-                continue  # Skip if seat class not available
-                
-            available_seats, price_multiplier = seat_info
-            
-            # Calculate dynamic price
-            dynamic_price = calculate_dynamic_price(
-                base_price=base_price,
-                seat_class_multiplier=price_multiplier,
-                available_seats=available_seats,
-                total_seats=total_seats,
-                departure_time=departure_time
-            )
-            
-            flights.append({
-                "flight_id": flight_id,
-                "flight_number": flight_number,
-                "airline_name": airline_name,
-                "origin": origin,
-                "destination": destination,
-                "departure_time": departure_time,
-                "arrival_time": arrival_time,
-                "base_price": base_price,
-                "dynamic_price": dynamic_price,
-                "available_seats": available_seats,
-                "seat_class": seat_class
-            })
-        
-        # Sort flights if requested
-        if sort_by:
-            if sort_by == "price":
-                flights.sort(key=lambda x: x["dynamic_price"])
-            elif sort_by == "duration":
-                flights.sort(key=lambda x: (
-                    datetime.strptime(x["arrival_time"], "%Y-%m-%d %H:%M:%S") - 
-                    datetime.strptime(x["departure_time"], "%Y-%m-%d %H:%M:%S")
-                ).total_seconds())
-            elif sort_by == "departure_time":
-                flights.sort(key=lambda x: x["departure_time"])
+        # Parse once; strptime also accepts "2026-11-5", so the query bounds
+        # and cache key use the normalized date rather than the raw string
+        departure_day = datetime.strptime(departure_date, "%Y-%m-%d").date()
         
-        conn.close()
-        return flights
+        key = cache.search_key(origin, destination, departure_day.isoformat(), seat_class, sort_by)
+        return _json_response(cache.get_or_compute(
+            key,
+            lambda: _find_flights(origin, destination, departure_day, seat_class, sort_by)
+        ))
         
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
@@ -132,8 +309,8 @@ async def search_flights(
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # Get flight details endpoint
-@app.get("/api/flights/{flight_id}", response_model=FlightDetail)
-async def get_flight_details(
+@app.get("/api/flights/{flight_id}", responses={200: {"model": FlightDetail}})
+def get_flight_details(
     flight_id: int,
     seat_class: str = Query("Economy", description="Seat class (Economy, Business, First)")
 ):
@@ -141,42 +318,23 @@ async def get_flight_details(
     Get detailed information about a specific flight
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get flight details
-        cursor.execute("""
-            SELECT f.flight_id, f.flight_number, a.airline_name, 
-                   f.origin, f.destination, f.departure_time, f.arrival_time,
-                   f.base_price, f.total_seats
-            FROM Flights f
-            JOIN Airlines a ON f.airline_id = a.airline_id
-            WHERE f.flight_id = ?
-        """, (flight_id,))
-        
-        flight = cursor.fetchone()
-        if not flight:
-            raise HTTPException(status_code=404, detail="Flight not found")
+        with get_reader() as conn:
+            cursor = conn.cursor()
             
-        flight_id, flight_number, airline_name, origin, destination, departure_time, arrival_time, base_price, total_seats = flight
-        
-        # Get seat availability
-        cursor.execute("""
-            SELECT seat_id, seat_class, initial_inventory, available_seats, price_multiplier 
-            FROM Seats 
-            WHERE flight_id = ?
-        """, (flight_id,))
+            # Get flight details
+            flight = _load_flight_meta(conn, flight_id)
+            if not flight:
+                raise HTTPException(status_code=404, detail="Flight not found")
+            
+            # Get seat availability
+            cursor.execute("""
+                SELECT seat_id, seat_class, initial_inventory, available_seats, price_multiplier 
+                FROM Seats 
+                WHERE flight_id = ?
+            """, (flight_id,))
+            seat_rows = cursor.fetchall()
         
-        seats = []
-        for row in cursor.fetchall():
-            seat_id, seat_class_db, initial_inventory, available_seats, price_multiplier = row
-            seats.append({
-                "seat_id": seat_id,
-                "seat_class": seat_class_db,
-                "initial_inventory": initial_inventory,
-                "available_seats": available_seats,
-                "price_multiplier": price_multiplier
-            })
+        seats = [dict(row) for row in seat_rows]
         
         # Get specific seat class info
         seat_info = next((s for s in seats if s["seat_class"] == seat_class), None)
@@ -185,338 +343,314 @@ async def get_flight_details(
         
         # Calculate dynamic price
         dynamic_price = calculate_dynamic_price(
-            base_price=base_price,
+            base_price=flight["base_price"],
             seat_class_multiplier=seat_info["price_multiplier"],
             available_seats=seat_info["available_seats"],
-            total_seats=total_seats,
-            departure_time=departure_time
+            total_seats=flight["total_seats"],
+            departure_time=flight["departure_time"]
         )
         
-        conn.close()
-        
-        return {
-            "flight_id": flight_id,
-            "flight_number": flight_number,
-            "airline_name": airline_name,
-            "origin": origin,
-            "destination": destination,
-            "departure_time": departure_time,
-            "arrival_time": arrival_time,
-            "base_price": base_price,
+        return _json_response({
+            "flight_id": flight["flight_id"],
+            "flight_number": flight["flight_number"],
+            "airline_name": flight["airline_name"],
+            "origin": flight["origin"],
+            "destination": flight["destination"],
+            "departure_time": flight["departure_time"],
+            "arrival_time": flight["arrival_time"],
+            "base_price": flight["base_price"],
             "dynamic_price": dynamic_price,
             "seat_class": seat_class,
             "available_seats": seat_info["available_seats"],
             "seats_available": seats
-        }
+        })
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+def _finalize_booking(passenger_rows, transaction_row, history_row):
+    """
+    Write the passenger, payment and audit rows for a committed booking
+    
+    Runs as a background task after the response is sent, so the write
+    lock held by create_booking only covers the seat reservation and the
+    Bookings row.
+    """
+    with get_writer() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.executemany(_INSERT_PASSENGER_SQL, passenger_rows)
+            cursor.execute(_INSERT_TRANSACTION_SQL, transaction_row)
+            cursor.execute(_INSERT_HISTORY_SQL, history_row)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Error finalizing booking {history_row[0]}: {str(e)}")
+
 # Create booking endpoint
 @app.post("/api/bookings", response_model=BookingResponse)
-async def create_booking(booking: BookingRequest):
-    booking_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    conn = None
-    try:
-        conn = get_db_connection()
-        conn.isolation_level = None
-        cursor = conn.cursor()
-        cursor.execute("BEGIN IMMEDIATE")
-        cursor.execute(
-            "SELECT flight_id, base_price, total_seats, departure_time FROM Flights WHERE flight_id = ?",
-            (booking.flight_id,)
-        )
-        flight = cursor.fetchone()
-        if not flight:
-            raise HTTPException(status_code=404, detail="Flight not found")
-        flight_id, base_price, total_seats, departure_time = flight
-        cursor.execute(
-            """
-            SELECT available_seats, price_multiplier
-            FROM Seats
-            WHERE flight_id = ? AND seat_class = ?
-            """,
-            (booking.flight_id, booking.seat_class)
-        )
-        seat_info = cursor.fetchone()
-        if not seat_info:
-            raise HTTPException(status_code=404, detail=f"Seat class {booking.seat_class} not available")
-        available_seats, price_multiplier = seat_info
-        if available_seats < booking.seats_count:
-            raise HTTPException(
-                status_code=409,
-                detail=f"Only {available_seats} seats available, requested {booking.seats_count}"
+def create_booking(booking: BookingRequest, background_tasks: BackgroundTasks):
+    booking_now = datetime.now()
+    booking_timestamp = booking_now.strftime("%Y-%m-%d %H:%M:%S")
+    with get_writer() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            flight = _load_flight_meta(conn, booking.flight_id)
+            if not flight:
+                raise HTTPException(status_code=404, detail="Flight not found")
+            base_price = flight["base_price"]
+            total_seats = flight["total_seats"]
+            departure_time = flight["departure_time"]
+            cursor.execute(
+                _RESERVE_SEATS_SQL,
+                (booking.seats_count, booking.flight_id, booking.seat_class, booking.seats_count)
             )
-        price_per_seat = calculate_dynamic_price(
-            base_price=base_price,
-            seat_class_multiplier=price_multiplier,
-            available_seats=available_seats,
-            total_seats=total_seats,
-            departure_time=departure_time
-        )
-        total_price = round(price_per_seat * booking.seats_count, 2)
-        pnr = generate_pnr()
-        cursor.execute(
-            """
-            INSERT INTO Bookings (flight_id, user_id, seat_class, seats_booked, final_price, booking_date, status, pnr)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                booking.flight_id,
-                booking.user_id,
-                booking.seat_class,
-                booking.seats_count,
-                total_price,
-                booking_timestamp,
-                "Confirmed",
-                pnr
+            reserved = cursor.fetchone()
+            if not reserved:
+                cursor.execute(_SEAT_SQL, (booking.flight_id, booking.seat_class))
+                seat_info = cursor.fetchone()
+                if not seat_info:
+                    raise HTTPException(status_code=404, detail=f"Seat class {booking.seat_class} not available")
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Only {seat_info[0]} seats available, requested {booking.seats_count}"
+                )
+            remaining_seats, price_multiplier = reserved
+            # Price on availability before this booking's seats were taken
+            available_seats = remaining_seats + booking.seats_count
+            price_per_seat = calculate_dynamic_price(
+                base_price=base_price,
+                seat_class_multiplier=price_multiplier,
+                available_seats=available_seats,
+                total_seats=total_seats,
+                departure_time=departure_time,
+                now=booking_now
             )
-        )
-        booking_id = cursor.lastrowid
-        passengers = []
-        for passenger in booking.passengers or []:
-            passenger_dict = passenger.dict()
-            passengers.append(passenger_dict)
-            cursor.execute(
-                """
-                INSERT INTO Passengers (booking_id, first_name, last_name, email, phone)
-                VALUES (?, ?, ?, ?, ?)
-                """,
+            total_price = round(price_per_seat * booking.seats_count, 2)
+            for attempt in range(PNR_ATTEMPTS):
+                try:
+                    cursor.execute(
+                        _INSERT_BOOKING_SQL,
+                        (
+                            booking.flight_id,
+                            booking.user_id,
+                            booking.seat_class,
+                            booking.seats_count,
+                            total_price,
+                            booking_timestamp,
+                            "Confirmed"
+                        )
+                    )
+                    booking_id, pnr = cursor.fetchone()
+                    break
+                except sqlite3.IntegrityError as e:
+                    # The flight was loaded above, so a foreign key failure
+                    # here can only be the user_id
+                    if "FOREIGN KEY" in str(e):
+                        raise HTTPException(status_code=404, detail="User not found")
+                    # Retry only on a PNR collision
+                    if "Bookings.pnr" not in str(e) or attempt == PNR_ATTEMPTS - 1:
+                        raise
+            conn.commit()
+            passengers = booking.passengers or []
+            background_tasks.add_task(
+                _finalize_booking,
+                [(booking_id, p.first_name, p.last_name, p.email, p.phone) for p in passengers],
+                (booking_id, total_price, booking.payment_method, "Completed", booking_timestamp),
                 (
                     booking_id,
-                    passenger_dict.get("first_name"),
-                    passenger_dict.get("last_name"),
-                    passenger_dict.get("email"),
-                    passenger_dict.get("phone")
+                    "CREATED",
+                    f"Booked {booking.seats_count} seats in {booking.seat_class}",
+                    booking_timestamp
                 )
             )
-        cursor.execute(
-            """
-            UPDATE Seats
-            SET available_seats = available_seats - ?
-            WHERE flight_id = ? AND seat_class = ?
-            """,
-            (booking.seats_count, booking.flight_id, booking.seat_class)
-        )
-        cursor.execute(
-            """
-            INSERT INTO Transactions (booking_id, amount, payment_method, status, transaction_date)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (booking_id, total_price, booking.payment_method, "Completed", booking_timestamp)
-        )
-        cursor.execute(
-            """
-            INSERT INTO BookingHistory (booking_id, action, details, performed_at)
-            VALUES (?, ?, ?, ?)
-            """,
-            (
-                booking_id,
-                "CREATED",
-                f"Booked {booking.seats_count} seats in {booking.seat_class}",
-                booking_timestamp
-            )
-        )
-        conn.commit()
-        return {
-            "success": True,
-            "message": "Booking created successfully",
-            "booking": {
-                "booking_id": booking_id,
-                "flight_id": booking.flight_id,
-                "user_id": booking.user_id,
-                "seat_class": booking.seat_class,
-                "seats_booked": booking.seats_count,
-                "final_price": total_price,
-                "booking_date": booking_timestamp,
-                "status": "Confirmed",
-                "pnr": pnr,
-                "passengers": passengers
-            },
-            "pricing_summary": {
-                "price_per_seat": price_per_seat,
-                "seats_booked": booking.seats_count,
-                "total_price": total_price
+            result = {
+                "success": True,
+                "message": "Booking created successfully",
+                "booking": {
+                    "booking_id": booking_id,
+                    "flight_id": booking.flight_id,
+                    "user_id": booking.user_id,
+                    "seat_class": booking.seat_class,
+                    "seats_booked": booking.seats_count,
+                    "final_price": total_price,
+                    "booking_date": booking_timestamp,
+                    "status": "Confirmed",
+                    "pnr": pnr,
+                    "passengers": passengers
+                },
+                "pricing_summary": {
+                    "price_per_seat": price_per_seat,
+                    "seats_booked": booking.seats_count,
+                    "total_price": total_price
+                }
             }
-        }
-    except HTTPException:
-        if conn:
+        except HTTPException:
             conn.rollback()
-        raise
-    except Exception as e:
-        if conn:
+            raise
+        except Exception as e:
             conn.rollback()
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
+            raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    # The Redis SCAN runs after the writer lock is released so it never
+    # holds up other bookings
+    cache.invalidate_search_date(departure_time[:10])
+    return result
 
 @app.post("/api/bookings/{booking_id}/cancel")
-async def cancel_booking(booking_id: int):
-    cancellation_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    conn = None
-    try:
-        conn = get_db_connection()
-        conn.isolation_level = None
-        cursor = conn.cursor()
-        cursor.execute("BEGIN IMMEDIATE")
-        cursor.execute(
-            """
-            SELECT booking_id, flight_id, seat_class, seats_booked, final_price, status
-            FROM Bookings
-            WHERE booking_id = ?
-            """,
-            (booking_id,)
-        )
-        booking = cursor.fetchone()
-        if not booking:
-            raise HTTPException(status_code=404, detail="Booking not found")
-        if booking[5] == "Cancelled":
-            return {
-                "success": True,
-                "booking_id": booking_id,
-                "status": "Cancelled",
-                "refund": {
-                    "percentage": 0,
-                    "amount": 0.0
+def cancel_booking(booking_id: int):
+    cancellation_now = datetime.now()
+    cancellation_time = cancellation_now.strftime("%Y-%m-%d %H:%M:%S")
+    with get_writer() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                """
+                SELECT flight_id, seat_class, seats_booked, final_price, status
+                FROM Bookings
+                WHERE booking_id = ?
+                """,
+                (booking_id,)
+            )
+            booking = cursor.fetchone()
+            if not booking:
+                raise HTTPException(status_code=404, detail="Booking not found")
+            if booking["status"] == "Cancelled":
+                return {
+                    "success": True,
+                    "booking_id": booking_id,
+                    "status": "Cancelled",
+                    "refund": {
+                        "percentage": 0,
+                        "amount": 0.0
+                    }
                 }
-            }
-        cursor.execute(
-            "SELECT departure_time FROM Flights WHERE flight_id = ?",
-            (booking[1],)
-        )
-        flight = cursor.fetchone()
-        if not flight:
-            raise HTTPException(status_code=404, detail="Flight not found for booking")
-        refund_percentage = calculate_refund_percentage(flight[0])
-        refund_amount = round((booking[4] * refund_percentage) / 100, 2)
-        cursor.execute(
-            """
-            SELECT initial_inventory, available_seats
-            FROM Seats
-            WHERE flight_id = ? AND seat_class = ?
-            """,
-            (booking[1], booking[2])
-        )
-        seat_row = cursor.fetchone()
-        if not seat_row:
-            raise HTTPException(status_code=404, detail="Seat configuration not found")
-        new_available = seat_row[1] + booking[3]
-        if new_available > seat_row[0]:
-            new_available = seat_row[0]
-        cursor.execute(
-            "UPDATE Bookings SET status = ? WHERE booking_id = ?",
-            ("Cancelled", booking_id)
-        )
-        cursor.execute(
-            "UPDATE Seats SET available_seats = ? WHERE flight_id = ? AND seat_class = ?",
-            (new_available, booking[1], booking[2])
-        )
-        if refund_amount > 0:
+            cursor.execute(
+                "SELECT departure_time FROM Flights WHERE flight_id = ?",
+                (booking["flight_id"],)
+            )
+            flight = cursor.fetchone()
+            if not flight:
+                raise HTTPException(status_code=404, detail="Flight not found for booking")
+            refund_percentage = calculate_refund_percentage(flight[0], cancellation_now)
+            refund_amount = round((booking["final_price"] * refund_percentage) / 100, 2)
             cursor.execute(
                 """
-                INSERT INTO Transactions (booking_id, amount, payment_method, status, transaction_date)
-                VALUES (?, ?, ?, ?, ?)
+                SELECT initial_inventory, available_seats
+                FROM Seats
+                WHERE flight_id = ? AND seat_class = ?
                 """,
-                (booking_id, -refund_amount, "REFUND", "Completed", cancellation_time)
+                (booking["flight_id"], booking["seat_class"])
             )
-        cursor.execute(
-            """
-            INSERT INTO BookingHistory (booking_id, action, details, performed_at)
-            VALUES (?, ?, ?, ?)
-            """,
-            (
-                booking_id,
-                "CANCELLED",
-                f"Refund {refund_percentage}% amount {refund_amount}",
-                cancellation_time
+            seat_row = cursor.fetchone()
+            if not seat_row:
+                raise HTTPException(status_code=404, detail="Seat configuration not found")
+            new_available = seat_row[1] + booking["seats_booked"]
+            if new_available > seat_row[0]:
+                new_available = seat_row[0]
+            cursor.execute(
+                "UPDATE Bookings SET status = ? WHERE booking_id = ?",
+                ("Cancelled", booking_id)
             )
-        )
-        conn.commit()
-        return {
-            "success": True,
-            "booking_id": booking_id,
-            "status": "Cancelled",
-            "refund": {
-                "percentage": refund_percentage,
-                "amount": refund_amount
+            cursor.execute(
+                "UPDATE Seats SET available_seats = ? WHERE flight_id = ? AND seat_class = ?",
+                (new_available, booking["flight_id"], booking["seat_class"])
+            )
+            if refund_amount > 0:
+                cursor.execute(
+                    _INSERT_TRANSACTION_SQL,
+                    (booking_id, -refund_amount, "REFUND", "Completed", cancellation_time)
+                )
+            cursor.execute(
+                _INSERT_HISTORY_SQL,
+                (
+                    booking_id,
+                    "CANCELLED",
+                    f"Refund {refund_percentage}% amount {refund_amount}",
+                    cancellation_time
+                )
+            )
+            conn.commit()
+            result = {
+                "success": True,
+                "booking_id": booking_id,
+                "status": "Cancelled",
+                "refund": {
+                    "percentage": refund_percentage,
+                    "amount": refund_amount
+                }
             }
-        }
-    except HTTPException:
-        if conn:
+        except HTTPException:
             conn.rollback()
-        raise
-    except Exception as e:
-        if conn:
+            raise
+        except Exception as e:
             conn.rollback()
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
+            raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    cache.invalidate_search_date(flight[0][:10])
+    return result
 
 # Get user bookings endpoint
 @app.get("/api/users/{user_id}/bookings")
-async def get_user_bookings(user_id: int):
+def get_user_bookings(
+    user_id: int,
+    limit: int = Query(50, ge=1, le=200, description="Maximum bookings to return"),
+    before: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
     """
-    Get all bookings for a specific user
+    Get bookings for a specific user, newest first, one page at a time
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        if before:
+            before_date, _, before_id = before.rpartition("|")
+            try:
+                before_id = int(before_id)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            if not before_date:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
         
-        cursor.execute("""
-            SELECT b.booking_id, b.flight_id, b.seat_class, b.seats_booked, 
-                   b.final_price, b.booking_date, b.status, b.pnr,
-                   f.flight_number, f.origin, f.destination, 
-                   f.departure_time, f.arrival_time, a.airline_name
-            FROM Bookings b
-            JOIN Flights f ON b.flight_id = f.flight_id
-            JOIN Airlines a ON f.airline_id = a.airline_id
-            WHERE b.user_id = ?
-            ORDER BY b.booking_date DESC
-        """, (user_id,))
+        with get_reader() as conn:
+            cursor = conn.cursor()
+            
+            # Fetch one extra row to know whether another page follows
+            if before:
+                cursor.execute(
+                    _USER_BOOKINGS_BEFORE_SQL,
+                    (user_id, before_date, before_date, before_id, limit + 1)
+                )
+            else:
+                cursor.execute(_USER_BOOKINGS_FIRST_SQL, (user_id, limit + 1))
+            rows = cursor.fetchall()
         
-        bookings = []
-        for row in cursor.fetchall():
-            (booking_id, flight_id, seat_class, seats_booked, 
-             final_price, booking_date, status, pnr,
-             flight_number, origin, destination, 
-             departure_time, arrival_time, airline_name) = row
-             
-            bookings.append({
-                "booking_id": booking_id,
-                "flight_id": flight_id,
-                "flight_number": flight_number,
-                "airline_name": airline_name,
-                "origin": origin,
-                "destination": destination,
-                "departure_time": departure_time,
-                "arrival_time": arrival_time,
-                "seat_class": seat_class,
-                "seats_booked": seats_booked,
-                "final_price": final_price,
-                "booking_date": booking_date,
-                "status": status,
-                "pnr": pnr
-            })
+        bookings = [dict(row) for row in rows[:limit]]
         
-        conn.close()
+        next_cursor = None
+        if len(rows) > limit:
+            last = bookings[-1]
+            next_cursor = f"{last['booking_date']}|{last['booking_id']}"
         
         return {
             "success": True,
             "user_id": user_id,
             "count": len(bookings),
-            "bookings": bookings
+            "bookings": bookings,
+            "next_cursor": next_cursor
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # Get pricing endpoint
 @app.get("/api/pricing/flight/{flight_id}", response_model=PricingResponse)
-async def get_flight_pricing(
+def get_flight_pricing(
     flight_id: int,
     seat_class: str = Query("Economy", description="Seat class (Economy, Business, First)"),
     seats: int = Query(1, ge=1, le=9, description="Number of seats")
@@ -525,33 +659,27 @@ async def get_flight_pricing(
     Get pricing breakdown for a flight
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get flight details
-        cursor.execute("""
-            SELECT flight_number, base_price, total_seats, departure_time
-            FROM Flights WHERE flight_id = ?
-        """, (flight_id,))
-        
-        flight = cursor.fetchone()
-        if not flight:
-            raise HTTPException(status_code=404, detail="Flight not found")
+        with get_reader() as conn:
+            cursor = conn.cursor()
             
-        flight_number, base_price, total_seats, departure_time = flight
-        
-        # Get seat availability
-        cursor.execute("""
-            SELECT available_seats, price_multiplier 
-            FROM Seats 
-            WHERE flight_id = ? AND seat_class = ?
-        """, (flight_id, seat_class))
+            # Get flight details
+            flight = _load_flight_meta(conn, flight_id)
+            if not flight:
+                raise HTTPException(status_code=404, detail="Flight not found")
+            
+            # Get seat availability
+            cursor.execute(_SEAT_SQL, (flight_id, seat_class))
+            seat_info = cursor.fetchone()
         
-        seat_info = cursor.fetchone()
         if not seat_info:
             raise HTTPException(status_code=404, detail=f"Seat class {seat_class} not available")
             
         available_seats, price_multiplier = seat_info
+        flight_number = flight["flight_number"]
+        base_price = flight["base_price"]
+        total_seats = flight["total_seats"]
+        departure_time = flight["departure_time"]
+        now = datetime.now()
         
         # Calculate dynamic price
         dynamic_price = calculate_dynamic_price(
@@ -559,7 +687,8 @@ async def get_flight_pricing(
             seat_class_multiplier=price_multiplier,
             available_seats=available_seats,
             total_seats=total_seats,
-            departure_time=departure_time
+            departure_time=departure_time,
+            now=now
         )
         
         # Calculate pricing factors
@@ -571,13 +700,11 @@ async def get_flight_pricing(
         occupancy_ratio = (total_seats - available_seats) / total_seats
         
         # Calculate days until departure
-        departure_date = datetime.strptime(departure_time, "%Y-%m-%d %H:%M:%S")
-        days_until_departure = (departure_date - datetime.now()).days + 1
+        departure_date = datetime.fromisoformat(departure_time)
+        days_until_departure = (departure_date - now).days + 1
         if days_until_departure < 0:
             days_until_departure = 0
         
-        conn.close()
-        
         return {
             "success": True,
             "flight_number": flight_number,
@@ -604,4 +731,5 @@ async def get_flight_pricing(
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("backend:app", host="0.0.0.0", port=5000, reload=True)
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Flight Booking System - Search Cache
+Redis cache-aside layer for flight search results
+"""
+
+import json
+import os
+import time
+
+try:
+    import redis
+except ImportError:  # Redis is optional; searches fall back to SQLite
+    redis = None
+
+# Redis connection settings
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+SEARCH_CACHE_TTL = 60  # seconds
+SEARCH_LOCK_TTL = 5  # seconds
+LOCK_WAIT_STEPS = 20
+LOCK_WAIT_INTERVAL = 0.05  # seconds
+
+_client = None
+
+def connect():
+    """
+    Connect to Redis, leaving the cache disabled if it is unavailable
+    """
+    global _client
+    if redis is None:
+        return None
+
+    client = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+    try:
+        client.ping()
+    except redis.RedisError as e:
+        print(f"Redis unavailable, search cache disabled: {str(e)}")
+        return None
+
+    _client = client
+    return client
+
+def close():
+    """
+    Close the Redis connection
+    """
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+def search_key(origin, destination, departure_date, seat_class, sort_by=None):
+    """
+    Build the cache key for a flight search
+    """
+    return f"flights:search:{origin}:{destination}:{departure_date}:{seat_class}:{sort_by or 'default'}"
+
+def _get(key):
+    cached = _client.get(key)
+    return json.loads(cached) if cached is not None else None
+
+def get_or_compute(key, compute):
+    """
+    Return the cached value for key, or compute and cache it
+
+    A short-lived lock key stops concurrent misses from all hitting the
+    database; waiters poll briefly for the value before computing it
+    themselves.
+
+    Args:
+        key: Cache key
+        compute: Zero-argument callable producing a JSON-serializable value
+
+    Returns:
+        Cached or freshly computed value
+    """
+    if _client is None:
+        return compute()
+
+    lock_key = f"{key}:lock"
+    try:
+        cached = _get(key)
+        if cached is not None:
+            return cached
+
+        locked = _client.set(lock_key, 1, nx=True, ex=SEARCH_LOCK_TTL)
+        if not locked:
+            for _ in range(LOCK_WAIT_STEPS):
+                time.sleep(LOCK_WAIT_INTERVAL)
+                cached = _get(key)
+                if cached is not None:
+                    return cached
+    except redis.RedisError:
+        return compute()
+
+    try:
+        value = compute()
+        try:
+            _client.setex(key, SEARCH_CACHE_TTL, json.dumps(value))
+        except redis.RedisError:
+            pass
+        return value
+    finally:
+        if locked:
+            try:
+                _client.delete(lock_key)
+            except redis.RedisError:
+                pass
+
+def invalidate_search_date(departure_date):
+    """
+    Drop cached searches for a departure date (YYYY-MM-DD)
+    """
+    if _client is None:
+        return
+
+    try:
+        keys = list(_client.scan_iter(match=f"flights:search:*:*:{departure_date}:*"))
+        if keys:
+            _client.delete(*keys)
+    except redis.RedisError as e:
+        print(f"Failed to invalidate search cache: {str(e)}")
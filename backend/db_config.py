@@ -5,18 +5,168 @@ Handles database connection and initialization
 
 import sqlite3
 import os
+import queue
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
 # Database path
 DB_PATH = Path(__file__).parent.parent / "db" / "flight_booking.db"
 
+# Number of read-only connections kept open per process
+READER_POOL_SIZE = 8
+
+# Compiled statements kept per connection (pooled connections are long-lived)
+STATEMENT_CACHE_SIZE = 256
+
+# Per-connection PRAGMAs (journal_mode=WAL is persistent and set at init)
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-65536",  # 64 MiB page cache
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Indexes backing the hot queries; applied on every init so existing
+# databases pick them up too
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_flights_od_dep ON Flights(origin, destination, departure_time)",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_user_date ON Bookings(user_id, booking_date DESC)",
+)
+
+def configure_connection(conn):
+    """
+    Apply the per-connection PRAGMAs to an open connection
+    """
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def enable_wal(conn):
+    """
+    Switch the database file to write-ahead logging so readers are not
+    blocked while a booking commits
+    """
+    conn.execute("PRAGMA journal_mode=WAL")
+
+def ensure_indexes(conn):
+    """
+    Create any missing indexes and refresh planner statistics
+    """
+    for statement in INDEXES:
+        conn.execute(statement)
+    conn.execute("ANALYZE")
+    conn.commit()
+
 def get_db_connection():
     """
     Create a database connection and return it
     """
-    conn = sqlite3.connect(str(DB_PATH))
+    # FastAPI runs endpoints on a threadpool, so allow cross-thread use
+    conn = sqlite3.connect(
+        str(DB_PATH),
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE
+    )
     conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-    return conn
+    return configure_connection(conn)
+
+class ReaderPool:
+    """
+    Fixed-size pool of read-only connections, opened lazily on first use
+    """
+
+    def __init__(self, size=READER_POOL_SIZE):
+        self.size = size
+        self._idle = queue.Queue(maxsize=size)
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = get_db_connection()
+        conn.execute("PRAGMA query_only=1")
+        return conn
+
+    def acquire(self):
+        """
+        Take an idle connection, opening a new one while below capacity
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        return self._idle.get()
+
+    def release(self, conn):
+        """
+        Return a connection to the pool
+        """
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+class WriterConnection:
+    """
+    Single shared writer connection; callers are serialized by a lock
+    """
+
+    def __init__(self):
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        self._lock.acquire()
+        try:
+            if self._conn is None:
+                self._conn = get_db_connection()
+                # Writers manage transactions explicitly with BEGIN IMMEDIATE
+                self._conn.isolation_level = None
+            return self._conn
+        except Exception:
+            self._lock.release()
+            raise
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        finally:
+            self._lock.release()
+
+_reader_pool = ReaderPool()
+_writer = WriterConnection()
+
+@contextmanager
+def get_reader():
+    """
+    Borrow a read-only connection from the process-wide pool
+    """
+    conn = _reader_pool.acquire()
+    try:
+        yield conn
+    finally:
+        _reader_pool.release(conn)
+
+@contextmanager
+def get_writer():
+    """
+    Hold the process-wide writer connection for the duration of the block
+    """
+    conn = _writer.acquire()
+    try:
+        yield conn
+    finally:
+        _writer.release(conn)
 
 def initialize_database():
     """
@@ -28,6 +178,12 @@ def initialize_database():
     # Check if database already exists
     if os.path.exists(DB_PATH):
         print(f"Database already exists at {DB_PATH}")
+        conn = sqlite3.connect(str(DB_PATH))
+        try:
+            enable_wal(conn)
+            ensure_indexes(conn)
+        finally:
+            conn.close()
         return True
     
     print(f"Creating database at {DB_PATH}")
@@ -49,6 +205,8 @@ def initialize_database():
     try:
         cursor.executescript(schema_sql)
         conn.commit()
+        enable_wal(conn)
+        ensure_indexes(conn)
         print("Database schema created successfully")
         return True
     except Exception as e:
@@ -3,7 +3,25 @@ Flight Booking System - Dynamic Pricing Engine
 Calculates dynamic prices based on various factors
 """
 
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; batch pricing then uses NumPy ufuncs
+    njit = None
+
+
+# Timestamps are always "YYYY-MM-DD HH:MM:SS", which fromisoformat parses in
+# C without strptime's format interpreter; search results repeat the same
+# strings, so parses are memoized
+@lru_cache(maxsize=4096)
+def _parse_dt(value: str) -> datetime:
+    return datetime.fromisoformat(value)
 
 
 def calculate_dynamic_price(
@@ -12,51 +30,138 @@ def calculate_dynamic_price(
     available_seats: int,
     total_seats: int,
     departure_time: str,
-    demand_level: str = "medium"
+    demand_level: str = "medium",
+    now: Optional[datetime] = None
 ) -> float:
     price = base_price * seat_class_multiplier
     occupancy_ratio = (total_seats - available_seats) / total_seats
     occupancy_multiplier = calculate_occupancy_multiplier(occupancy_ratio)
-    time_multiplier = calculate_time_multiplier(departure_time)
+    time_multiplier = calculate_time_multiplier(departure_time, now)
     demand_multiplier = calculate_demand_multiplier(demand_level)
     final_price = price * occupancy_multiplier * time_multiplier * demand_multiplier
     return round(final_price, 2)
 
 
+# Multiplier ladders shared by the scalar and batch pricers. Occupancy steps
+# up at each break (ratio >= break); the time multiplier applies while days
+# until departure is <= each break.
+_OCCUPANCY_BREAKS = (0.4, 0.6, 0.8)
+_OCCUPANCY_VALUES = (1.0, 1.15, 1.35, 1.5)
+_TIME_BREAKS = (1, 3, 7, 14, 30)
+_TIME_VALUES = (2.0, 1.8, 1.5, 1.25, 1.1, 1.0)
+
+_OCCUPANCY_BREAKS_NP = np.array(_OCCUPANCY_BREAKS)
+_OCCUPANCY_VALUES_NP = np.array(_OCCUPANCY_VALUES)
+_TIME_BREAKS_NP = np.array(_TIME_BREAKS)
+_TIME_VALUES_NP = np.array(_TIME_VALUES)
+
+# Demand levels map to an index into _DEMAND_VALUES, which is what the
+# compiled kernel takes; unknown levels price as medium
+_DEMAND_CODES = {"low": 0, "medium": 1, "high": 2}
+_DEMAND_VALUES = (0.8, 1.0, 1.4)
+
+
+def _dynamic_price_kernel(base, mult, avail, total, days, demand_code):
+    # Unrounded price for one flight in pure float math over the ladders above,
+    # so Numba can compile it; days is fractional days until departure
+    occupancy = (total - avail) / total
+    occupancy_multiplier = _OCCUPANCY_VALUES[0]
+    for i in range(len(_OCCUPANCY_BREAKS)):
+        if occupancy >= _OCCUPANCY_BREAKS[i]:
+            occupancy_multiplier = _OCCUPANCY_VALUES[i + 1]
+    time_multiplier = _TIME_VALUES[-1]
+    for i in range(len(_TIME_BREAKS) - 1, -1, -1):
+        if days <= _TIME_BREAKS[i]:
+            time_multiplier = _TIME_VALUES[i]
+    return base * mult * occupancy_multiplier * time_multiplier * _DEMAND_VALUES[demand_code]
+
+
+def _price_flights_kernel(base, mult, avail, total, days, demand_code, out):
+    # Fills out with the unrounded price of every flight in a batch. This stays
+    # a serial loop rather than parallel=True/prange: it is called from
+    # FastAPI's worker threads, which Numba's parallel threading layers do not
+    # support running concurrently, and a search returns too few flights to
+    # cover the cost of starting threads.
+    for i in range(base.shape[0]):
+        out[i] = _dynamic_price_kernel(base[i], mult[i], avail[i], total[i], days[i], demand_code)
+
+
+# One call through Numba's dispatcher costs more than the kernel itself, so
+# calculate_dynamic_price keeps the bisect path and only batches are compiled
+if njit is not None:
+    _dynamic_price_kernel = njit(cache=True)(_dynamic_price_kernel)
+    _price_flights_kernel = njit(cache=True)(_price_flights_kernel)
+
+
+def batch_dynamic_price(
+    base_price: np.ndarray,
+    seat_class_multiplier: np.ndarray,
+    available_seats: np.ndarray,
+    total_seats: np.ndarray,
+    departure_time: np.ndarray,
+    demand_level: str = "medium",
+    now: Optional[datetime] = None
+) -> np.ndarray:
+    # Unrounded prices for many flights at once; departure_time is datetime64
+    now = np.datetime64(now or datetime.now(), "us")
+    days_until_departure = (departure_time.astype("datetime64[us]") - now) / np.timedelta64(1, "D")
+    
+    if njit is not None:
+        prices = np.empty(len(days_until_departure))
+        _price_flights_kernel(
+            np.ascontiguousarray(base_price, dtype=np.float64),
+            np.ascontiguousarray(seat_class_multiplier, dtype=np.float64),
+            np.ascontiguousarray(available_seats, dtype=np.float64),
+            np.ascontiguousarray(total_seats, dtype=np.float64),
+            days_until_departure,
+            _demand_code(demand_level),
+            prices
+        )
+        return prices
+    
+    price = base_price * seat_class_multiplier
+    occupancy_ratio = (total_seats - available_seats) / total_seats
+    occupancy_multiplier = _OCCUPANCY_VALUES_NP[np.searchsorted(_OCCUPANCY_BREAKS_NP, occupancy_ratio, side="right")]
+    time_multiplier = _TIME_VALUES_NP[np.searchsorted(_TIME_BREAKS_NP, days_until_departure, side="left")]
+    demand_multiplier = calculate_demand_multiplier(demand_level)
+    return price * occupancy_multiplier * time_multiplier * demand_multiplier
+
+
+def warm_up_batch_pricing() -> None:
+    # Compile the batch kernel, or load it from Numba's on-disk cache, at
+    # startup so the first search does not pay for it
+    if njit is None:
+        return
+    one = np.ones(1)
+    batch_dynamic_price(one, one, one, one, np.array([np.datetime64("now")]))
+
+
 def calculate_occupancy_multiplier(occupancy_ratio: float) -> float:
-    if occupancy_ratio >= 0.8:
-        return 1.5
-    if occupancy_ratio >= 0.6:
-        return 1.35
-    if occupancy_ratio >= 0.4:
-        return 1.15
-    return 1.0
-
-
-def calculate_time_multiplier(departure_time: str) -> float:
-    departure_date = datetime.strptime(departure_time, "%Y-%m-%d %H:%M:%S")
-    now = datetime.now()
-    days_until_departure = (departure_date - now).total_seconds() / (24 * 3600)
-    if days_until_departure <= 1:
-        return 2.0
-    if days_until_departure <= 3:
-        return 1.8
-    if days_until_departure <= 7:
-        return 1.5
-    if days_until_departure <= 14:
-        return 1.25
-    if days_until_departure <= 30:
-        return 1.1
-    return 1.0
+    return _OCCUPANCY_VALUES[bisect_right(_OCCUPANCY_BREAKS, occupancy_ratio)]
+
+
+def calculate_time_multiplier(departure_time: str, now: Optional[datetime] = None) -> float:
+    # Callers pricing several things for one request pass a single now
+    departure_date = _parse_dt(departure_time)
+    if now is None:
+        now = datetime.now()
+    return _time_multiplier_from_days((departure_date - now).total_seconds() / (24 * 3600))
+
+
+def _time_multiplier_from_days(days_until_departure: float) -> float:
+    return _TIME_VALUES[bisect_left(_TIME_BREAKS, days_until_departure)]
+
+
+def _demand_code(demand_level: str) -> int:
+    # Levels normally arrive lowercase, so try them as-is before lower()
+    code = _DEMAND_CODES.get(demand_level)
+    if code is None:
+        code = _DEMAND_CODES.get(demand_level.lower(), _DEMAND_CODES["medium"])
+    return code
 
 
 def calculate_demand_multiplier(demand_level: str) -> float:
-    level = demand_level.lower()
-    if level == "high":
-        return 1.4
-    if level == "low":
-        return 0.8
-    return 1.0
+    return _DEMAND_VALUES[_demand_code(demand_level)]
 
 
 def get_pricing_factors(
@@ -64,11 +169,15 @@ def get_pricing_factors(
     total_seats: int,
     departure_time: str,
     demand_level: str = "medium",
-    recent_bookings: int = 0
+    recent_bookings: int = 0,
+    now: Optional[datetime] = None
 ) -> dict:
+    if now is None:
+        now = datetime.now()
     occupancy_ratio = (total_seats - available_seats) / total_seats
-    departure_date = datetime.strptime(departure_time, "%Y-%m-%d %H:%M:%S")
-    days_until_departure = (departure_date - datetime.now()).days + 1
+    # Parse once; the time multiplier works from the same timedelta
+    time_to_departure = _parse_dt(departure_time) - now
+    days_until_departure = time_to_departure.days + 1
     if days_until_departure < 0:
         days_until_departure = 0
     booking_velocity = calculate_booking_velocity(recent_bookings, total_seats)
@@ -81,7 +190,7 @@ def get_pricing_factors(
         "recent_bookings": recent_bookings,
         "booking_velocity": booking_velocity,
         "occupancy_multiplier": calculate_occupancy_multiplier(occupancy_ratio),
-        "time_multiplier": calculate_time_multiplier(departure_time),
+        "time_multiplier": _time_multiplier_from_days(time_to_departure.total_seconds() / (24 * 3600)),
         "demand_multiplier": calculate_demand_multiplier(demand_level)
     }
 
@@ -5,7 +5,39 @@ Helper functions for the booking system
 
 import random
 import string
+from bisect import bisect_left
 from datetime import datetime, timedelta
+from functools import lru_cache
+
+@lru_cache(maxsize=4096)
+def _parse_dt(date_string):
+    """
+    Parse a "YYYY-MM-DD HH:MM:SS" string, memoized for repeated timestamps
+    """
+    return datetime.fromisoformat(date_string)
+
+# Refund tiers by hours until departure (hours >= break); the full refund
+# tier starts strictly after _REFUND_FULL_HOURS
+_REFUND_BREAKS = (2, 24)
+_REFUND_VALUES = (0, 50, 75)
+_REFUND_FULL_HOURS = 72
+
+@lru_cache(maxsize=512)
+def _refund_cutoffs(departure_time):
+    """
+    Tier cutoff times for a departure, memoized for the bookings list
+    
+    Returns the time after which the full refund ends, and the ascending
+    times up to which each of the _REFUND_BREAKS tiers still applies.
+    """
+    departure = _parse_dt(departure_time)
+    return (
+        departure - timedelta(hours=_REFUND_FULL_HOURS),
+        tuple(departure - timedelta(hours=hours) for hours in reversed(_REFUND_BREAKS))
+    )
+
+# Uppercase letters and digits, excluding similar looking characters
+_PNR_CHARACTERS = ''.join(c for c in string.ascii_uppercase + string.digits if c not in '0O1I')
 
 def generate_pnr(length=6):
     """
@@ -17,16 +49,7 @@ def generate_pnr(length=6):
     Returns:
         Random alphanumeric PNR code
     """
-    # Use uppercase letters and digits for PNR
-    characters = string.ascii_uppercase + string.digits
-    
-    # Exclude similar looking characters
-    characters = characters.replace('0', '').replace('O', '').replace('1', '').replace('I', '')
-    
-    # Generate random PNR
-    pnr = ''.join(random.choice(characters) for _ in range(length))
-    
-    return pnr
+    return ''.join(random.choices(_PNR_CHARACTERS, k=length))
 
 def format_price(price):
     """
@@ -50,22 +73,16 @@ def calculate_duration(departure_time, arrival_time):
         
     Returns:
         Duration string in format "Xh Ym"
-    """
-    try:
-        departure = datetime.strptime(departure_time, "%Y-%m-%d %H:%M:%S")
-        arrival = datetime.strptime(arrival_time, "%Y-%m-%d %H:%M:%S")
         
-        duration = arrival - departure
-        total_minutes = duration.total_seconds() / 60
-        
-        hours = int(total_minutes // 60)
-        minutes = int(total_minutes % 60)
-        
-        return f"{hours}h {minutes}m"
-    except:
-        return "Unknown"
+    Raises:
+        ValueError: If either time is not in "YYYY-MM-DD HH:MM:SS" format
+    """
+    duration = _parse_dt(arrival_time) - _parse_dt(departure_time)
+    total_minutes = int(duration.total_seconds() // 60)
+    
+    return f"{total_minutes // 60}h {total_minutes % 60}m"
 
-def calculate_refund_percentage(departure_time):
+def calculate_refund_percentage(departure_time, now=None):
     """
     Calculate refund percentage based on time to departure
     
@@ -77,32 +94,30 @@ def calculate_refund_percentage(departure_time):
     
     Args:
         departure_time: Departure time string
+        now: Current time (default: datetime.now())
         
     Returns:
         Refund percentage (0-100)
     """
     try:
-        departure = datetime.strptime(departure_time, "%Y-%m-%d %H:%M:%S")
-        now = datetime.now()
-        
-        # Calculate hours until departure
-        hours_until_departure = (departure - now).total_seconds() / 3600
+        full_cutoff, tier_cutoffs = _refund_cutoffs(departure_time)
+        if now is None:
+            now = datetime.now()
         
-        if hours_until_departure > 72:
+        if now < full_cutoff:
             return 100
-        elif hours_until_departure >= 24:
-            return 75
-        elif hours_until_departure >= 2:
-            return 50
-        else:
-            return 0
+        # Count the tiers whose cutoff has not passed yet
+        return _REFUND_VALUES[len(tier_cutoffs) - bisect_left(tier_cutoffs, now)]
     except:
         return 0
 
+@lru_cache(maxsize=2048)
 def format_datetime(date_string, include_time=True):
     """
     Format datetime string for display
     
+    Results are memoized since the same timestamps recur across rows.
+    
     Args:
         date_string: Datetime string
         include_time: Whether to include time in output
@@ -111,7 +126,7 @@ def format_datetime(date_string, include_time=True):
         Formatted datetime string
     """
     try:
-        dt = datetime.strptime(date_string, "%Y-%m-%d %H:%M:%S")
+        dt = _parse_dt(date_string)
         
         if include_time:
             return dt.strftime("%b %d, %Y %I:%M %p")
@@ -1,12 +1,15 @@
 import streamlit as st
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+import numpy as np
 from datetime import datetime, timedelta
+from functools import lru_cache, partial
 import json
-import plotly.express as px
+from urllib.parse import quote
 
 # API Configuration
 API_BASE_URL = "http://localhost:5000/api"
+API_TIMEOUT = 5  # seconds
 
 # Page configuration
 st.set_page_config(
@@ -17,33 +20,55 @@ st.set_page_config(
 )
 
 # Helper functions
+@lru_cache(maxsize=4096)
+def _parse_dt(dt_str):
+    """Parse an API datetime string, memoized across reruns"""
+    return datetime.fromisoformat(dt_str)
+
 def format_price(price):
     """Format price with currency symbol"""
     return f"${price:.2f}"
 
+@lru_cache(maxsize=2048)
 def format_datetime(dt_str):
-    """Format datetime string for display"""
-    dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
+    """Format datetime string for display, memoized across rows and reruns"""
+    dt = _parse_dt(dt_str)
     return dt.strftime("%b %d, %Y %I:%M %p")
 
 def calculate_duration(departure, arrival):
     """Calculate flight duration"""
-    dept = datetime.strptime(departure, "%Y-%m-%d %H:%M:%S")
-    arrv = datetime.strptime(arrival, "%Y-%m-%d %H:%M:%S")
+    dept = _parse_dt(departure)
+    arrv = _parse_dt(arrival)
     duration = arrv - dept
     hours = duration.seconds // 3600
     minutes = (duration.seconds % 3600) // 60
     return f"{hours}h {minutes}m"
 
+@st.cache_resource
+def get_http_session():
+    """Shared HTTP session so API calls reuse keep-alive connections across reruns"""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+    return session
+
+def add_display_fields(flight):
+    """Format a flight's display strings once so every booking step reuses them"""
+    flight["departure_display"] = format_datetime(flight["departure_time"])
+    flight["arrival_display"] = format_datetime(flight["arrival_time"])
+    flight["duration_display"] = calculate_duration(flight["departure_time"], flight["arrival_time"])
+    flight["price_display"] = format_price(flight["dynamic_price"])
+    return flight
+
 def api_request(endpoint, method="GET", data=None):
     """Make API request with error handling"""
     url = f"{API_BASE_URL}{endpoint}"
+    session = get_http_session()
     
     try:
         if method == "GET":
-            response = requests.get(url)
+            response = session.get(url, timeout=API_TIMEOUT)
         elif method == "POST":
-            response = requests.post(url, json=data)
+            response = session.post(url, json=data, timeout=API_TIMEOUT)
         else:
             st.error(f"Unsupported method: {method}")
             return None
@@ -57,6 +82,70 @@ def api_request(endpoint, method="GET", data=None):
         st.error(f"Error connecting to API: {str(e)}")
         return None
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _get_json(endpoint):
+    """GET an API endpoint; failures raise, so they are never cached"""
+    response = get_http_session().get(f"{API_BASE_URL}{endpoint}", timeout=API_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+def cached_get(endpoint):
+    """GET an API endpoint through a 60 second cache, with error handling"""
+    try:
+        return _get_json(endpoint)
+    except requests.HTTPError as e:
+        st.error(f"API Error: {e.response.status_code} - {e.response.text}")
+        return None
+    except Exception as e:
+        st.error(f"Error connecting to API: {str(e)}")
+        return None
+
+def fetch_user_bookings(user_id):
+    """Fetch all bookings for a user, following the API's page cursor"""
+    bookings = []
+    cursor = None
+    while True:
+        endpoint = f"/users/{user_id}/bookings?limit=200"
+        if cursor:
+            endpoint += f"&before={quote(cursor)}"
+        response = cached_get(endpoint)
+        if not response or not response.get("success", False):
+            return None
+        bookings.extend(response.get("bookings", []))
+        cursor = response.get("next_cursor")
+        if not cursor:
+            return bookings
+
+@st.cache_data(show_spinner=False)
+def price_history_data(start_date):
+    """Sample 30-day price history starting at start_date"""
+    import pandas as pd
+    i = np.arange(30)
+    return pd.DataFrame({
+        'Date': pd.date_range(start=start_date, periods=30, freq='D'),
+        'Economy': 300 + i * 5 + (i % 7) * 20,
+        'Business': 600 + i * 10 + (i % 7) * 40
+    })
+
+@st.cache_data(show_spinner=False)
+def occupancy_impact_data():
+    """Price multiplier at sample occupancy levels"""
+    import pandas as pd
+    occupancy_levels = np.arange(1, 10) / 10
+    return pd.DataFrame({
+        'Occupancy': [f"{int(o*100)}%" for o in occupancy_levels],
+        'Price Multiplier': [1.0, 1.0, 1.0, 1.0, 1.15, 1.15, 1.35, 1.35, 1.5]
+    })
+
+@st.cache_data(show_spinner=False)
+def time_impact_data():
+    """Price multiplier at sample days before departure"""
+    import pandas as pd
+    return pd.DataFrame({
+        'Days to Departure': [1, 3, 7, 14, 30, 60, 90],
+        'Price Multiplier': [2.0, 1.8, 1.5, 1.25, 1.1, 1.0, 1.0]
+    })
+
 # Sidebar for user selection and navigation
 st.sidebar.title("✈️ Flight Booking System")
 
@@ -73,8 +162,8 @@ page = st.sidebar.radio(
     options=["Search Flights", "My Bookings", "Pricing Analytics"]
 )
 
-# Initialize session state for booking flow
-if "booking_flow" not in st.session_state:
+def reset_booking_flow():
+    """Start the booking flow over from the search step"""
     st.session_state.booking_flow = {
         "step": 0,  # 0: search, 1: flight selected, 2: passenger info, 3: payment, 4: confirmation
         "selected_flight": None,
@@ -82,14 +171,31 @@ if "booking_flow" not in st.session_state:
         "booking_id": None
     }
 
+def set_booking_step(step):
+    """Button callback: runs before the rerun, so the new step renders without another one"""
+    st.session_state.booking_flow["step"] = step
+
+def select_flight(results_key):
+    """Results table callback: move the selected flight to the passenger step"""
+    rows = st.session_state[results_key].selection.rows
+    if not rows:
+        return
+    flow = st.session_state.booking_flow
+    flight = flow["search_results"][rows[0]]
+    passenger_count = flow["search_passengers"]
+    # Store selected flight in session state
+    flow["step"] = 1
+    flow["selected_flight"] = flight
+    flow["passenger_count"] = passenger_count
+    flow["total_display"] = format_price(flight["dynamic_price"] * passenger_count)
+    flow["results_version"] += 1
+
+# Initialize session state for booking flow
+if "booking_flow" not in st.session_state:
+    reset_booking_flow()
+
 # Reset booking flow
-if st.sidebar.button("New Search"):
-    st.session_state.booking_flow = {
-        "step": 0,
-        "selected_flight": None,
-        "passenger_info": [],
-        "booking_id": None
-    }
+st.sidebar.button("New Search", on_click=reset_booking_flow)
 
 # Search Flights Page
 if page == "Search Flights" and st.session_state.booking_flow["step"] == 0:
@@ -163,7 +269,7 @@ if page == "Search Flights" and st.session_state.booking_flow["step"] == 0:
                     params += f"&sort_by={sort_by}"
                 
                 # Make API request
-                flights = api_request(f"/flights/search{params}")
+                flights = cached_get(f"/flights/search{params}")
                 
                 if flights is None:
                     st.error("Failed to fetch flights")
@@ -181,43 +287,50 @@ if page == "Search Flights" and st.session_state.booking_flow["step"] == 0:
                         st.error("Unexpected response format from API")
                     
                     if fetch_success:
-                        if not flight_data:
-                            st.info("No flights found for the selected criteria")
-                        else:
-                            st.success(f"Found {len(flight_data)} flights")
-                            
-                            # Display flights
-                            for flight in flight_data:
-                                col1, col2, col3, col4 = st.columns([2, 3, 2, 1])
-                                
-                                with col1:
-                                    st.subheader(f"{flight['airline_name']}")
-                                    st.caption(f"Flight {flight['flight_number']}")
-                                
-                                with col2:
-                                    st.write(f"**{flight['origin']} → {flight['destination']}**")
-                                    st.write(f"{format_datetime(flight['departure_time'])} → {format_datetime(flight['arrival_time'])}")
-                                    st.caption(f"Duration: {calculate_duration(flight['departure_time'], flight['arrival_time'])}")
-                                
-                                with col3:
-                                    st.write(f"**Price: {format_price(flight['dynamic_price'])}**")
-                                    st.write(f"Seat Class: {flight['seat_class']}")
-                                    st.caption(f"Available Seats: {flight['available_seats']}")
-                                
-                                with col4:
-                                    if st.button("Select", key=f"select_{flight['flight_id']}"):
-                                        # Store selected flight in session state
-                                        st.session_state.booking_flow["step"] = 1
-                                        st.session_state.booking_flow["selected_flight"] = flight
-                                        st.session_state.booking_flow["passenger_count"] = passengers
-                                        st.experimental_rerun()
-                                
-                                st.divider()
+                        for flight in flight_data:
+                            add_display_fields(flight)
+                        # Keep results across reruns so the table selection below sees them
+                        st.session_state.booking_flow["search_results"] = flight_data
+                        st.session_state.booking_flow["search_passengers"] = passengers
+                        st.session_state.booking_flow["results_version"] = st.session_state.booking_flow.get("results_version", 0) + 1
                     else:
+                        st.session_state.booking_flow["search_results"] = None
                         if isinstance(flights, dict) and flights.get("message"):
                             st.error(flights.get("message"))
                         else:
                             st.error("Failed to fetch flights")
+    
+    # Display flights
+    flight_data = st.session_state.booking_flow.get("search_results")
+    if flight_data is not None:
+        if not flight_data:
+            st.info("No flights found for the selected criteria")
+        else:
+            st.success(f"Found {len(flight_data)} flights")
+            
+            # One table with row selection instead of a button per flight
+            results_key = f"flight_results_{st.session_state.booking_flow.get('results_version', 0)}"
+            st.dataframe(
+                {
+                    "Airline": [f["airline_name"] for f in flight_data],
+                    "Flight": [f["flight_number"] for f in flight_data],
+                    "Route": [f"{f['origin']} → {f['destination']}" for f in flight_data],
+                    "Departure": [f["departure_display"] for f in flight_data],
+                    "Arrival": [f["arrival_display"] for f in flight_data],
+                    "Duration": [f["duration_display"] for f in flight_data],
+                    "Price": [f["price_display"] for f in flight_data],
+                    "Seat Class": [f["seat_class"] for f in flight_data],
+                    "Available Seats": [f["available_seats"] for f in flight_data]
+                },
+                hide_index=True,
+                use_container_width=True,
+                # st.dataframe takes no args=, so bind the key into the callback
+                on_select=partial(select_flight, results_key),
+                selection_mode="single-row",
+                # A new key per search or selection starts the table unselected
+                key=results_key
+            )
+            st.caption("Select a flight to continue")
 
 # Flight Selected - Passenger Information
 elif page == "Search Flights" and st.session_state.booking_flow["step"] == 1:
@@ -236,13 +349,13 @@ elif page == "Search Flights" and st.session_state.booking_flow["step"] == 1:
     
     with col2:
         st.write(f"**{flight['origin']} → {flight['destination']}**")
-        st.write(f"{format_datetime(flight['departure_time'])}")
-        st.write(f"Duration: {calculate_duration(flight['departure_time'], flight['arrival_time'])}")
+        st.write(f"{flight['departure_display']}")
+        st.write(f"Duration: {flight['duration_display']}")
     
     with col3:
-        st.write(f"**Price: {format_price(flight['dynamic_price'])} per seat**")
+        st.write(f"**Price: {flight['price_display']} per seat**")
         st.write(f"Seat Class: {flight['seat_class']}")
-        st.write(f"Total: {format_price(flight['dynamic_price'] * passenger_count)} ({passenger_count} passengers)")
+        st.write(f"Total: {st.session_state.booking_flow['total_display']} ({passenger_count} passengers)")
     
     st.divider()
     
@@ -294,11 +407,9 @@ elif page == "Search Flights" and st.session_state.booking_flow["step"] == 1:
             # Store passenger information
             st.session_state.booking_flow["passenger_info"] = passengers
             st.session_state.booking_flow["step"] = 2
-            st.experimental_rerun()
+            st.rerun()
     
-    if st.button("← Back to Search"):
-        st.session_state.booking_flow["step"] = 0
-        st.experimental_rerun()
+    st.button("← Back to Search", on_click=set_booking_step, args=(0,))
 
 # Payment
 elif page == "Search Flights" and st.session_state.booking_flow["step"] == 2:
@@ -315,13 +426,13 @@ elif page == "Search Flights" and st.session_state.booking_flow["step"] == 2:
     with col1:
         st.write(f"**Flight:** {flight['airline_name']} {flight['flight_number']}")
         st.write(f"**Route:** {flight['origin']} → {flight['destination']}")
-        st.write(f"**Date:** {format_datetime(flight['departure_time'])}")
+        st.write(f"**Date:** {flight['departure_display']}")
         st.write(f"**Seat Class:** {flight['seat_class']}")
     
     with col2:
-        st.write(f"**Price per seat:** {format_price(flight['dynamic_price'])}")
+        st.write(f"**Price per seat:** {flight['price_display']}")
         st.write(f"**Passengers:** {passenger_count}")
-        st.write(f"**Total Price:** {format_price(flight['dynamic_price'] * passenger_count)}")
+        st.write(f"**Total Price:** {st.session_state.booking_flow['total_display']}")
     
     st.divider()
     
@@ -371,17 +482,17 @@ elif page == "Search Flights" and st.session_state.booking_flow["step"] == 2:
             booking_response = api_request("/bookings", method="POST", data=booking_data)
             
             if booking_response and booking_response.get("success", False):
+                # Seat counts and the user's bookings changed, so drop cached GETs
+                _get_json.clear()
                 # Store booking ID
                 st.session_state.booking_flow["booking_id"] = booking_response["booking"]["booking_id"]
                 st.session_state.booking_flow["booking_details"] = booking_response["booking"]
                 st.session_state.booking_flow["step"] = 3
-                st.experimental_rerun()
+                st.rerun()
             else:
                 st.error("Failed to create booking. Please try again.")
     
-    if st.button("← Back to Passenger Information"):
-        st.session_state.booking_flow["step"] = 1
-        st.experimental_rerun()
+    st.button("← Back to Passenger Information", on_click=set_booking_step, args=(1,))
 
 # Booking Confirmation
 elif page == "Search Flights" and st.session_state.booking_flow["step"] == 3:
@@ -412,25 +523,15 @@ elif page == "Search Flights" and st.session_state.booking_flow["step"] == 3:
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        if st.button("View My Bookings"):
-            # Switch to My Bookings page
-            st.session_state.booking_flow["step"] = 0
-            st.experimental_rerun()
+        # Leave the confirmation step
+        st.button("View My Bookings", on_click=set_booking_step, args=(0,))
     
     with col2:
         if st.button("Download Receipt"):
             st.info("Receipt download functionality would be implemented here")
     
     with col3:
-        if st.button("New Search"):
-            # Reset booking flow
-            st.session_state.booking_flow = {
-                "step": 0,
-                "selected_flight": None,
-                "passenger_info": [],
-                "booking_id": None
-            }
-            st.experimental_rerun()
+        st.button("New Search", on_click=reset_booking_flow, key="confirmation_new_search")
 
 # My Bookings Page
 elif page == "My Bookings":
@@ -438,11 +539,9 @@ elif page == "My Bookings":
     
     with st.spinner("Loading your bookings..."):
         # Get user bookings
-        bookings_response = api_request(f"/users/{user_id}/bookings")
+        bookings = fetch_user_bookings(user_id)
         
-        if bookings_response and bookings_response.get("success", False):
-            bookings = bookings_response.get("bookings", [])
-            
+        if bookings is not None:
             if not bookings:
                 st.info("You don't have any bookings yet")
             else:
@@ -479,6 +578,9 @@ elif page == "My Bookings":
 
 # Pricing Analytics Page
 elif page == "Pricing Analytics":
+    # Only this page plots, so plotly is imported on first visit, not at startup
+    import plotly.express as px
+    
     st.title("Pricing Analytics")
     
     # Flight selection for analytics
@@ -507,16 +609,7 @@ elif page == "Pricing Analytics":
                 # For demo purposes, we'll generate sample data
                 
                 # Sample data for price history
-                dates = pd.date_range(start=datetime.now(), periods=30, freq='D')
-                economy_prices = [300 + i * 5 + (i % 7) * 20 for i in range(30)]
-                business_prices = [600 + i * 10 + (i % 7) * 40 for i in range(30)]
-                
-                # Create DataFrame
-                df = pd.DataFrame({
-                    'Date': dates,
-                    'Economy': economy_prices,
-                    'Business': business_prices
-                })
+                df = price_history_data(datetime.now().date())
                 
                 # Plot price trends
                 st.subheader(f"Price Trends: {origin} → {destination}")
@@ -550,14 +643,7 @@ elif page == "Pricing Analytics":
                 st.subheader("Occupancy Impact on Pricing")
                 
                 # Sample data for occupancy impact
-                occupancy_levels = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
-                price_multipliers = [1.0, 1.0, 1.0, 1.0, 1.15, 1.15, 1.35, 1.35, 1.5]
-                
-                # Create DataFrame
-                df_occupancy = pd.DataFrame({
-                    'Occupancy': [f"{int(o*100)}%" for o in occupancy_levels],
-                    'Price Multiplier': price_multipliers
-                })
+                df_occupancy = occupancy_impact_data()
                 
                 # Plot occupancy impact
                 fig_occupancy = px.bar(
@@ -576,14 +662,7 @@ elif page == "Pricing Analytics":
                 st.subheader("Time to Departure Impact")
                 
                 # Sample data for time impact
-                days_to_departure = [1, 3, 7, 14, 30, 60, 90]
-                time_multipliers = [2.0, 1.8, 1.5, 1.25, 1.1, 1.0, 1.0]
-                
-                # Create DataFrame
-                df_time = pd.DataFrame({
-                    'Days to Departure': days_to_departure,
-                    'Price Multiplier': time_multipliers
-                })
+                df_time = time_impact_data()
                 
                 # Plot time impact
                 fig_time = px.line(